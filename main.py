@@ -1,26 +1,28 @@
 import os
 import logging
-import time
-import socket
 import asyncio
+import hashlib
+import re
+import shelve
+import time
 import warnings
+from calendar import timegm
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from telegram.ext import ApplicationBuilder, ContextTypes
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+import feedparser
 import httpx
+import numpy as np
+import orjson
+from aiolimiter import AsyncLimiter
+from sentence_transformers import SentenceTransformer
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from tensorflow import get_logger
 
 # Suppress logging
 get_logger().setLevel('ERROR')
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
-os.environ['WDM_LOG'] = str(logging.ERROR)
 warnings.filterwarnings("ignore")
 
 # Load environment variables
@@ -43,6 +45,7 @@ HEADERS = {
     "Content-Type": "application/json"
 }
 TIMEOUT = 30
+SCRAPE_TIMEOUT = 10
 INFLUENCERS = [
     ("justsaurabh1103", "Saurabh Tiwari"),
     ("TheDustyBC", "DustyBC Crypto"),
@@ -57,188 +60,408 @@ INFLUENCERS = [
     ("CryptoWizardd", "WIZZ"),
     ("MartiniGuyYT", "That Martini Guy ₿"),
 ]
+# Parallel tuples plus precomputed per-influencer alert pieces, so the
+# cycle loop and message building index immutable data instead of
+# re-formatting the same strings every alert
+_HANDLES = tuple(handle for handle, _ in INFLUENCERS)
+_NAMES = tuple(name for _, name in INFLUENCERS)
+_URL_PREFIX = tuple(f"https://twitter.com/{handle}/status/" for handle in _HANDLES)
+_ALERT_HDR = tuple(f"🚨 BUY ALERT from {name}\n" for name in _NAMES)
 
-class TwitterScraper:
-    def __init__(self):
-        options = Options()
-        options.add_argument("--headless=new")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--window-size=1920,1080")
-        options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        
-        try:
-            self.driver = webdriver.Chrome(
-                service=ChromeService(ChromeDriverManager().install()),
-                options=options
-            )
-            logger.info("WebDriver initialized")
-        except Exception as e:
-            logger.error(f"WebDriver init failed: {str(e)}")
-            raise
-
-    def get_recent_tweets(self, handle: str) -> list[dict]:
-        logger.info(f"Scraping @{handle}")
-        tweets = []
-        cutoff_time = datetime.now(timezone.utc) - timedelta(hours=1)
-        
-        try:
-            self.driver.get(f"https://nitter.net/{handle}")
-            time.sleep(3)
-            
-            tweet_elements = self.driver.find_elements(By.CSS_SELECTOR, ".timeline-item")[:5]
-            logger.debug(f"Found {len(tweet_elements)} tweets")
-
-            for tweet in tweet_elements:
-                try:
-                    content = tweet.find_element(By.CSS_SELECTOR, ".tweet-content").text
-                    link = tweet.find_element(By.CSS_SELECTOR, "a.tweet-link").get_attribute("href")
-                    tweet_id = link.split("/status/")[1].split("#")[0]
-                    
-                    date_str = tweet.find_element(By.CSS_SELECTOR, ".tweet-date a").get_attribute("title")
-                    tweet_time = datetime.strptime(
-                        date_str.replace(" UTC", ""), 
-                        "%b %d, %Y · %I:%M %p"
-                    ).replace(tzinfo=timezone.utc)
-                    
-                    if tweet_time > cutoff_time:
-                        tweets.append({
-                            'text': content[:500],
-                            'id': tweet_id,
-                            'handle': handle,
-                            'time': tweet_time
-                        })
-                        logger.info(f"New tweet @{tweet_time.isoformat()}")
-                        
-                except (NoSuchElementException, ValueError) as e:
-                    logger.debug(f"Skipping tweet: {str(e)}")
-                    continue
+_TWEET_ID_RE = re.compile(r"/status/(\d+)")
 
-        except Exception as e:
-            logger.error(f"Scraping error: {str(e)}")
-            
-        logger.info(f"Found {len(tweets)} valid tweets")
-        return tweets
+# On-disk set of already-analyzed tweet IDs so restarts and overlapping
+# cycles never re-classify (or re-alert) the same tweet
+SEEN_DB_PATH = "seen_tweets.db"
+SEEN_TTL = 7 * 24 * 3600
+SEEN = shelve.open(SEEN_DB_PATH)
 
-    def close(self):
-        try:
-            self.driver.quit()
-            logger.debug("WebDriver closed")
-        except Exception as e:
-            logger.error(f"Close error: {str(e)}")
+def _prune_seen():
+    cutoff = time.time() - SEEN_TTL
+    stale = [tweet_id for tweet_id, seen_at in SEEN.items() if seen_at < cutoff]
+    for tweet_id in stale:
+        del SEEN[tweet_id]
+    if stale:
+        logger.debug(f"Pruned {len(stale)} stale seen IDs")
+
+# Per-handle RSS ETags for conditional GETs; a 304 means nothing new
+# and costs no response body at all
+ETAG_DB_PATH = "rss_etags.db"
+ETAGS = shelve.open(ETAG_DB_PATH)
 
-async def check_network_connection():
+# Optional local INT8 classifier: a quantized distilBERT fine-tuned for
+# buy-recommendation detection replaces the remote 8B Llama entirely
+# (~5 ms CPU inference, no network). Falls back to the HF API when the
+# exported model or its runtime isn't available.
+LOCAL_CLF_PATH = "buy_clf.int8.onnx"
+LOCAL_CLF = None
+LOCAL_TOKENIZER = None
+if os.path.exists(LOCAL_CLF_PATH):
     try:
-        reader, writer = await asyncio.open_connection("api-inference.huggingface.co", 443)
-        writer.close()
-        await writer.wait_closed()
-        return True
-    except (socket.gaierror, OSError) as e:
-        logger.error(f"Network error: {str(e)}")
-        return False
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        LOCAL_CLF = ort.InferenceSession(
+            LOCAL_CLF_PATH, providers=['CPUExecutionProvider']
+        )
+        LOCAL_TOKENIZER = AutoTokenizer.from_pretrained('distilbert-base-uncased')
+        logger.info("Local INT8 classifier loaded")
+    except Exception as e:
+        logger.error(f"Local classifier load failed: {str(e)}")
+        LOCAL_CLF = None
+        LOCAL_TOKENIZER = None
 
-def create_prompt(text: str) -> str:
-    return (
-        "<|begin_of_text|>"
-        "<|start_header_id|>system<|end_header_id|>"
-        "Analyze if this tweet explicitly recommends buying cryptocurrency. "
-        "Respond ONLY with 'YES' or 'NO'.<|eot_id|>"
-        "<|start_header_id|>user<|end_header_id|>"
-        f"{text[:500]}<|eot_id|>"
-        "<|start_header_id|>assistant<|end_header_id|>"
+def _classify_local(texts: list[str]) -> list[bool]:
+    tokens = LOCAL_TOKENIZER(
+        [t[:256] for t in texts],
+        return_tensors='np',
+        padding='max_length',
+        truncation=True,
+        max_length=128
     )
+    logits = LOCAL_CLF.run(None, dict(tokens))[0]
+    return [bool(row[1] > row[0]) for row in logits]
+
+HF_CLIENT = httpx.AsyncClient(
+    http2=True,
+    timeout=TIMEOUT,
+    headers=HEADERS,
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+)
+
+SCRAPE_CLIENT = httpx.AsyncClient(
+    http2=True,
+    timeout=SCRAPE_TIMEOUT,
+    limits=httpx.Limits(max_connections=8),
+    headers={"User-Agent": "Mozilla/5.0 (X11; Linux x86_64)"}
+)
+
+async def fetch_tweets(client: httpx.AsyncClient, handle: str) -> list[dict]:
+    logger.info(f"Fetching RSS for @{handle}")
+    tweets = []
+    cutoff_time = datetime.now(timezone.utc) - timedelta(hours=1)
+
+    try:
+        headers = {}
+        etag = ETAGS.get(handle)
+        if etag:
+            headers["If-None-Match"] = etag
+
+        response = await client.get(f"https://nitter.net/{handle}/rss", headers=headers)
+        if response.status_code == 304:
+            logger.debug(f"@{handle} unchanged (304)")
+            return []
+        response.raise_for_status()
+
+        new_etag = response.headers.get("ETag")
+        if new_etag:
+            ETAGS[handle] = new_etag
+
+        feed = feedparser.parse(response.content)
+        logger.debug(f"Found {len(feed.entries)} entries")
+
+        for entry in feed.entries[:5]:
+            try:
+                match = _TWEET_ID_RE.search(entry.link)
+                if match is None:
+                    logger.debug(f"No tweet ID in {entry.link}")
+                    continue
+                tweet_id = match.group(1)
+                if tweet_id in SEEN:
+                    logger.debug(f"Already analyzed {tweet_id}")
+                    continue
+
+                tweet_time = datetime.fromtimestamp(
+                    timegm(entry.published_parsed), tz=timezone.utc
+                )
+
+                if tweet_time > cutoff_time:
+                    tweets.append({
+                        'text': entry.title[:500],
+                        'id': tweet_id,
+                        'handle': handle,
+                        'time': tweet_time
+                    })
+                    logger.info(f"New tweet @{tweet_time.isoformat()}")
+
+            except (AttributeError, TypeError, ValueError) as e:
+                logger.debug(f"Skipping entry: {str(e)}")
+                continue
+
+    except Exception as e:
+        logger.error(f"Feed error: {str(e)}")
+
+    logger.info(f"Found {len(tweets)} valid tweets")
+    return tweets
+
+# Exact-match verdict cache: the model runs at temperature 0.1, so
+# repeated/retweeted text gets the same answer without an API call
+_VERDICT_CACHE: OrderedDict[bytes, bool] = OrderedDict()
+_VERDICT_CACHE_MAX = 4096
+
+def _cache_key(text: str) -> bytes:
+    return hashlib.sha1(text[:500].encode()).digest()
+
+def _cache_store(key: bytes, verdict: bool):
+    _VERDICT_CACHE[key] = verdict
+    if len(_VERDICT_CACHE) > _VERDICT_CACHE_MAX:
+        _VERDICT_CACHE.popitem(last=False)
+
+# Semantic cache: paraphrased "buy $X" tweets across accounts miss the
+# exact cache, so also match on embedding similarity
+EMBEDDER = SentenceTransformer('all-MiniLM-L6-v2')
+SEMANTIC_THRESHOLD = 0.87
+_SEMANTIC_CACHE_MAX = 1024
+_semantic_vecs = np.empty((0, 384), dtype=np.float32)
+_semantic_labels: list[bool] = []
+
+def _semantic_lookup(text: str) -> tuple[bool | None, np.ndarray]:
+    vec = EMBEDDER.encode([text[:500]], normalize_embeddings=True)[0].astype(np.float32)
+    if _semantic_vecs.size:
+        sims = _semantic_vecs @ vec
+        best = int(sims.argmax())
+        if sims[best] >= SEMANTIC_THRESHOLD:
+            return _semantic_labels[best], vec
+    return None, vec
+
+def _semantic_store(vec: np.ndarray, verdict: bool):
+    global _semantic_vecs
+    _semantic_vecs = np.vstack([_semantic_vecs, vec])
+    _semantic_labels.append(verdict)
+    if len(_semantic_labels) > _SEMANTIC_CACHE_MAX:
+        _semantic_vecs = _semantic_vecs[1:]
+        del _semantic_labels[0]
+
+# Byte-identical prompt prefix across all calls also lets the HF
+# gateway reuse its prefix KV cache
+_PROMPT_PREFIX = (
+    "<|begin_of_text|>"
+    "<|start_header_id|>system<|end_header_id|>"
+    "Analyze if this tweet explicitly recommends buying cryptocurrency. "
+    "Respond ONLY with 'YES' or 'NO'.<|eot_id|>"
+    "<|start_header_id|>user<|end_header_id|>"
+)
+_PROMPT_SUFFIX = "<|eot_id|><|start_header_id|>assistant<|end_header_id|>"
+
+def create_prompt(text: str) -> str:
+    return _PROMPT_PREFIX + text[:500] + _PROMPT_SUFFIX
+
+GEN_PARAMS = {
+    "max_new_tokens": 10,
+    "temperature": 0.1,
+    "return_full_text": False
+}
+
+# Pace requests just under the HF quota instead of relying on reactive
+# 429 backoff, and cap in-flight concurrency
+HF_LIMITER = AsyncLimiter(max_rate=5, time_period=1)
+HF_SEMAPHORE = asyncio.Semaphore(10)
 
 @retry(
     stop=stop_after_attempt(2),
     wait=wait_exponential(multiplier=1, min=2, max=15),
-    retry=retry_if_exception_type((httpx.ConnectError, httpx.TimeoutException)),
+    retry=retry_if_exception_type((
+        httpx.ConnectError,
+        httpx.TimeoutException,
+        httpx.RemoteProtocolError,
+        httpx.ReadError,
+    )),
+    reraise=True,
 )
+async def _hf_post(inputs) -> httpx.Response:
+    async with HF_SEMAPHORE, HF_LIMITER:
+        return await HF_CLIENT.post(
+            HF_API_URL,
+            content=orjson.dumps({"inputs": inputs, "parameters": GEN_PARAMS})
+        )
+
+def _log_api_error(response: httpx.Response):
+    logger.error(f"API error {response.status_code}: {response.text[:200]}")
+    if response.status_code == 401:
+        logger.error("Invalid API token")
+    elif response.status_code == 404:
+        logger.error("Model not found")
+
+def _parse_verdict(item: dict) -> bool:
+    answer = item.get('generated_text', '').strip().upper()
+    logger.info(f"API response: {answer}")
+    return answer == 'YES'
+
 async def is_buy_signal(text: str) -> bool:
-    if not await check_network_connection():
-        return False
+    key = _cache_key(text)
+    cached = _VERDICT_CACHE.get(key)
+    if cached is not None:
+        _VERDICT_CACHE.move_to_end(key)
+        logger.debug("Verdict cache hit")
+        return cached
+
+    semantic_verdict, vec = _semantic_lookup(text)
+    if semantic_verdict is not None:
+        logger.debug("Semantic cache hit")
+        return semantic_verdict
+
+    if LOCAL_CLF is not None:
+        verdict = _classify_local([text])[0]
+        _cache_store(key, verdict)
+        _semantic_store(vec, verdict)
+        return verdict
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                HF_API_URL,
-                headers=HEADERS,
-                json={
-                    "inputs": create_prompt(text),
-                    "parameters": {
-                        "max_new_tokens": 10,
-                        "temperature": 0.1,
-                        "return_full_text": False
-                    }
-                },
-                timeout=TIMEOUT
-            )
-            
+        response = await _hf_post(create_prompt(text))
+
         if response.status_code == 200:
-            result = response.json()
+            result = orjson.loads(response.content)
             if not isinstance(result, list) or len(result) == 0:
                 logger.error("Invalid API response")
                 return False
-                
-            answer = result[0].get('generated_text', '').strip().upper()
-            logger.info(f"API response: {answer}")
-            return answer == 'YES'
-            
-        logger.error(f"API error {response.status_code}: {response.text[:200]}")
-        if response.status_code == 401:
-            logger.error("Invalid API token")
-        elif response.status_code == 404:
-            logger.error("Model not found")
-            
+
+            verdict = _parse_verdict(result[0])
+            _cache_store(key, verdict)
+            _semantic_store(vec, verdict)
+            return verdict
+
+        _log_api_error(response)
         return False
-        
+
     except httpx.RequestError as e:
         logger.error(f"Connection error: {str(e)}")
-        raise
+        return False
     except Exception as e:
         logger.error(f"Analysis error: {str(e)}")
         return False
 
+async def classify_batch(texts: list[str]) -> list[bool]:
+    verdicts: list[bool | None] = [None] * len(texts)
+    pending = []
+
+    for i, text in enumerate(texts):
+        key = _cache_key(text)
+        cached = _VERDICT_CACHE.get(key)
+        if cached is not None:
+            _VERDICT_CACHE.move_to_end(key)
+            verdicts[i] = cached
+            continue
+        semantic_verdict, vec = _semantic_lookup(text)
+        if semantic_verdict is not None:
+            verdicts[i] = semantic_verdict
+            continue
+        pending.append((i, key, vec))
+
+    if pending and LOCAL_CLF is not None:
+        logger.info(f"Classifying batch of {len(pending)} tweets locally")
+        for (i, key, vec), verdict in zip(
+            pending, _classify_local([texts[i] for i, _, _ in pending])
+        ):
+            _cache_store(key, verdict)
+            _semantic_store(vec, verdict)
+            verdicts[i] = verdict
+        pending = []
+
+    if pending:
+        logger.info(f"Classifying batch of {len(pending)} tweets")
+        try:
+            response = await _hf_post([create_prompt(texts[i]) for i, _, _ in pending])
+
+            if response.status_code == 200:
+                result = orjson.loads(response.content)
+                if isinstance(result, list) and len(result) == len(pending):
+                    for (i, key, vec), item in zip(pending, result):
+                        verdict = _parse_verdict(item)
+                        _cache_store(key, verdict)
+                        _semantic_store(vec, verdict)
+                        verdicts[i] = verdict
+                else:
+                    logger.error("Invalid batch response")
+            else:
+                _log_api_error(response)
+        except Exception as e:
+            logger.error(f"Batch error: {str(e)}")
+
+    # Fall back to per-item calls for anything the batch didn't resolve,
+    # in parallel (in-flight concurrency is capped by HF_SEMAPHORE)
+    unresolved = [i for i, verdict in enumerate(verdicts) if verdict is None]
+    if unresolved:
+        fallback = await asyncio.gather(
+            *(is_buy_signal(texts[i]) for i in unresolved),
+            return_exceptions=True
+        )
+        for i, verdict in zip(unresolved, fallback):
+            if isinstance(verdict, BaseException):
+                logger.error(f"Fallback error: {str(verdict)}")
+                verdicts[i] = False
+            else:
+                verdicts[i] = verdict
+
+    return verdicts
+
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
     logger.error(f"Telegram error: {context.error}", exc_info=context.error)
 
 async def check_influencers(context: ContextTypes.DEFAULT_TYPE):
     logger.info("Starting monitoring cycle")
-    scraper = TwitterScraper()
-    
+    _prune_seen()
+
     try:
-        for handle, name in INFLUENCERS:
-            logger.info(f"Checking {name}")
-            tweets = scraper.get_recent_tweets(handle)
-            
+        results = await asyncio.gather(
+            *(fetch_tweets(SCRAPE_CLIENT, handle) for handle in _HANDLES),
+            return_exceptions=True
+        )
+
+        all_tweets = []
+        for i, tweets in enumerate(results):
+            if isinstance(tweets, BaseException):
+                logger.error(f"Scraping error for {_NAMES[i]}: {str(tweets)}")
+                continue
+
             if not tweets:
                 logger.debug("No recent tweets")
                 continue
-                
-            logger.info(f"Analyzing {len(tweets)} tweets")
-            for tweet in tweets:
-                logger.info(f"Tweet @{tweet['time'].isoformat()}")
-                try:
-                    is_buy = await is_buy_signal(tweet['text'])
-                    logger.info(f"Buy signal: {is_buy}")
-                    if is_buy:
-                        message = (
-                            f"🚨 BUY ALERT from {name}\n"
-                            f"📅 {tweet['time'].strftime('%Y-%m-%d %H:%M UTC')}\n"
-                            f"📝 {tweet['text'][:200]}...\n"
-                            f"🔗 https://twitter.com/{handle}/status/{tweet['id']}"
-                        )
-                        await context.bot.send_message(GROUP_CHAT_ID, message)
-                        logger.info("Alert sent")
-                except Exception as e:
-                    logger.error(f"Processing error: {str(e)}")
-                    
+
+            all_tweets.extend((i, tweet) for tweet in tweets)
+
+        if not all_tweets:
+            return
+
+        logger.info(f"Analyzing {len(all_tweets)} tweets")
+        verdicts = await classify_batch([tweet['text'] for _, tweet in all_tweets])
+
+        send_sem = asyncio.Semaphore(8)
+
+        async def send_alert(i, tweet):
+            async with send_sem:
+                message = (
+                    _ALERT_HDR[i] +
+                    f"📅 {tweet['time'].strftime('%Y-%m-%d %H:%M UTC')}\n"
+                    f"📝 {tweet['text'][:200]}...\n"
+                    f"🔗 {_URL_PREFIX[i]}{tweet['id']}"
+                )
+                await context.bot.send_message(GROUP_CHAT_ID, message)
+                logger.info("Alert sent")
+
+        alerts = []
+        for (i, tweet), is_buy in zip(all_tweets, verdicts):
+            logger.info(f"Tweet @{tweet['time'].isoformat()} buy signal: {is_buy}")
+            SEEN[tweet['id']] = time.time()
+            if is_buy:
+                alerts.append(send_alert(i, tweet))
+
+        if alerts:
+            for outcome in await asyncio.gather(*alerts, return_exceptions=True):
+                if isinstance(outcome, BaseException):
+                    logger.error(f"Processing error: {str(outcome)}")
+
     except Exception as e:
         logger.error(f"Cycle error: {str(e)}")
     finally:
-        scraper.close()
+        SEEN.sync()
+        ETAGS.sync()
         logger.info("Monitoring complete")
 
+async def shutdown(app):
+    await HF_CLIENT.aclose()
+    await SCRAPE_CLIENT.aclose()
+    SEEN.close()
+    ETAGS.close()
+
 def main():
     required_vars = ['TELEGRAM_BOT_TOKEN', 'HF_API_TOKEN', 'GROUP_CHAT_ID']
     missing_vars = [var for var in required_vars if not os.getenv(var)]
@@ -247,7 +470,12 @@ def main():
         return
 
     try:
-        app = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
+        app = (
+            ApplicationBuilder()
+            .token(TELEGRAM_BOT_TOKEN)
+            .post_shutdown(shutdown)
+            .build()
+        )
         app.add_error_handler(error_handler)
         app.job_queue.run_repeating(check_influencers, interval=3600, first=10)
         logger.info("Bot started")